@@ -1,30 +1,137 @@
 """
 Festival Web Scraper with Multipage Support and Smart CSV Export
 Dependencies:
-    pip install beautifulsoup4 requests selenium webdriver-manager
+    pip install selectolax aiohttp "aiohttp-client-cache[sqlite]" orjson selenium webdriver-manager
 """
 
+import asyncio
 import csv
-import time
-import json
+import gzip
 import os
+import shelve
+import time
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urljoin
 
+import aiohttp
+import orjson
+from aiohttp_client_cache import CachedSession, SQLiteBackend
 from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser, LexborNode
+
+
+BASE_URL = 'https://www.musicfestivalwizard.com'
+
+# Matched by Lexbor's C selector engine rather than a per-node Python predicate
+FESTIVAL_LINK_SELECTOR = 'a[href*="/festivals/"]'
+# Every block a festival page is read from, matched in a single document pass
+DETAIL_SELECTOR = 'script[type="application/ld+json"], div.headerblock, div.hublineup'
+# A rendered festival page is usable once either of these is present
+DETAIL_READY_SELECTOR = 'script[type="application/ld+json"], div.headerblock'
+
+# Failed or refused requests (403, 429, timeouts) are retried in the browser
+FETCH_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+# Maximum number of page requests in flight at once
+CONCURRENCY = 16
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+    'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
+)
+REQUEST_TIMEOUT = 15
+RENDER_TIMEOUT = 8
+
+CSV_HEADER = ('Festival', 'Date', 'Location', 'Artists')
+# Rows between gzip flushes: bounds crash loss without a sync block per row
+CSV_FLUSH_EVERY = 50
+
+# Only the HTML is read, so the browser never fetches styling or media
+BLOCKED_RESOURCE_URLS = ['*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot']
+CHROME_PREFS = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.default_content_setting_values.notifications': 2,
+}
+
+# Kept across runs so the fallback browser starts warm
+STATE_DIR = os.path.expanduser('~/.festival-scraper')
+CHROME_PROFILE_DIR = os.path.join(STATE_DIR, 'chrome-profile')
+CHROME_CACHE_DIR = os.path.join(STATE_DIR, 'chrome-cache')
+CHROMEDRIVER_PATH_FILE = os.path.join(STATE_DIR, 'chromedriver-path')
+
+# Festival pages change rarely, so re-runs within a day skip the network
+CACHE_EXPIRE_AFTER = 24 * 60 * 60
+HTTP_CACHE_PATH = os.path.join(STATE_DIR, 'http-cache.sqlite')
+RENDER_CACHE_PATH = os.path.join(STATE_DIR, 'render-cache')
+
+
+def name_from_url(url: str) -> str:
+    """Derive a festival name from the slug of its URL."""
+    return url.split('/')[-2].replace('-', ' ').title()
+
+
+def find_detail_blocks(tree: LexborHTMLParser) -> Dict[str, Optional[LexborNode]]:
+    """Locate the first JSON-LD script, header block and lineup of a festival page."""
+    blocks = {'json_ld': None, 'headerblock': None, 'hublineup': None}
+    for node in tree.css(DETAIL_SELECTOR):
+        if node.tag == 'script':
+            key = 'json_ld'
+        elif 'headerblock' in (node.attributes.get('class') or '').split():
+            key = 'headerblock'
+        else:
+            key = 'hublineup'
+        if blocks[key] is None:
+            blocks[key] = node
+            if all(blocks.values()):
+                break
+    return blocks
+
+
+def chromedriver_path(refresh: bool = False) -> str:
+    """Return the ChromeDriver binary, only installing one if none is cached."""
+    if not refresh:
+        try:
+            with open(CHROMEDRIVER_PATH_FILE, encoding='utf-8') as f:
+                path = f.read().strip()
+            if os.path.isfile(path):
+                return path
+        except OSError:
+            pass
 
+    path = ChromeDriverManager().install()
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(CHROMEDRIVER_PATH_FILE, 'w', encoding='utf-8') as f:
+        f.write(path)
+    return path
 
-class FestivalScraper:
-    """Scraper using Selenium with WebDriver Manager"""
 
-    def __init__(self):
+class FestivalScraper:
+    """Scraper fetching server-rendered HTML, with Selenium as a fallback"""
+
+    def __init__(self, session: aiohttp.ClientSession):
+        """Fetch through the given session; the browser is only started on demand"""
+        self.session = session
+        self._semaphore = asyncio.Semaphore(CONCURRENCY)
+        self._driver = None
+        # WebDriver is not thread-safe, so renders are serialized
+        self._driver_lock = asyncio.Lock()
+
+    @property
+    def driver(self) -> webdriver.Chrome:
+        """Chrome driver, started the first time a page needs JavaScript"""
+        if self._driver is None:
+            self._driver = self._start_driver()
+        return self._driver
+
+    def _start_driver(self) -> webdriver.Chrome:
         """Initialize Chrome driver with options to avoid detection"""
         print("\n🚀 Initializing Chrome WebDriver...")
 
@@ -36,48 +143,105 @@ class FestivalScraper:
         chrome_options.add_argument('--disable-extensions')
         chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('window-size=1920,1080')
-        chrome_options.add_argument(
-            'user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-            'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
-        )
+        chrome_options.add_argument(f'user-agent={USER_AGENT}')
+        chrome_options.add_argument(f'--user-data-dir={CHROME_PROFILE_DIR}')
+        chrome_options.add_argument(f'--disk-cache-dir={CHROME_CACHE_DIR}')
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
+        chrome_options.add_experimental_option('prefs', CHROME_PREFS)
 
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        try:
+            driver = webdriver.Chrome(service=Service(chromedriver_path()), options=chrome_options)
+        except SessionNotCreatedException as e:
+            # Only a Chrome upgrade is fixed by a new driver; e.g. a profile locked by another run is not
+            if 'only supports Chrome version' not in (e.msg or ''):
+                raise
+            driver = webdriver.Chrome(service=Service(chromedriver_path(refresh=True)), options=chrome_options)
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        # Chrome has no content setting for stylesheets or fonts; block them at the network layer
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_RESOURCE_URLS})
 
         print("✓ Browser initialized successfully")
-
-    def get_total_pages(self, soup: BeautifulSoup) -> int:
+        return driver
+
+    async def fetch(self, url: str) -> bytes:
+        """Fetch the server-rendered HTML of a page"""
+        async with self._semaphore, self.session.get(url) as resp:
+            resp.raise_for_status()
+            return await resp.read()
+
+    async def fetch_in_browser(self, url: str, ready_selector: str) -> str:
+        """Render a page in the shared browser, one page at a time"""
+        async with self._driver_lock:
+            return await asyncio.to_thread(self.render, url, ready_selector)
+
+    def render(self, url: str, ready_selector: str) -> str:
+        """Return the browser-rendered DOM of a page, reusing a recent render if cached"""
+        with shelve.open(RENDER_CACHE_PATH) as cache:
+            cached = cache.get(url)
+            if cached and time.time() - cached[0] < CACHE_EXPIRE_AFTER:
+                return cached[1]
+            html, ready = self._render_in_browser(url, ready_selector)
+            # Timed-out loads, error and challenge pages are not cached, so a re-run retries them
+            if ready:
+                cache[url] = (time.time(), html)
+        return html
+
+    def _render_in_browser(self, url: str, ready_selector: str) -> Tuple[str, bool]:
+        """Load a page in the browser so its scripts run; return the DOM and whether it became ready"""
+        driver = self.driver
+        driver.get(url)
+        try:
+            WebDriverWait(driver, RENDER_TIMEOUT).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector))
+            )
+            ready = True
+        except TimeoutException:
+            ready = False  # Parse whatever did render, as the fixed sleep used to
+        # Serialize the DOM once; outerHTML skips page_source's driver-side round trip
+        return driver.execute_script("return document.documentElement.outerHTML"), ready
+
+    def get_total_pages(self, tree: LexborHTMLParser) -> int:
         """Detect total number of pages available"""
-        pagination = soup.find('ul', class_='page-numbers')
-        if not pagination:
-            return 1
-        page_links = pagination.find_all('a', class_='page-numbers')
-        page_numbers = []
-        for link in page_links:
-            try:
-                num = int(link.text.strip())
-                page_numbers.append(num)
-            except ValueError:
+        page_links = tree.css('ul.page-numbers a.page-numbers')
+        page_numbers = (int(text) for link in page_links if (text := link.text(strip=True)).isdecimal())
+        return max(page_numbers, default=1)
+
+    def add_festival_links(self, tree: LexborHTMLParser, festivals: Dict[str, Dict[str, str]]) -> int:
+        """Add the festivals linked from a list page, keyed by URL; return the link count"""
+        festival_links = tree.css(FESTIVAL_LINK_SELECTOR)
+        # Runs once per link on every page, so resolve globals to locals up front
+        join, base_url, fallback_name = urljoin, BASE_URL, name_from_url
+        for link in festival_links:
+            href = link.attributes.get('href') or ''
+            if not href or href.endswith('/festivals/'):
+                continue
+            href = join(base_url, href)
+            if href in festivals:
                 continue
-        return max(page_numbers) if page_numbers else 1
+            name = link.text(strip=True)
+            if not name or len(name) < 3:
+                name = fallback_name(href)
+            festivals[href] = {'name': name, 'url': href}
+        return len(festival_links)
 
-    def get_festival_links(self, base_url: str, max_pages: int = None) -> List[Dict[str, str]]:
+    async def get_festival_links(self, base_url: str, max_pages: int = None) -> List[Dict[str, str]]:
         """
         Scrape multiple pages of the main festival list to get all festival links.
         If max_pages is None, scrape all available pages.
         """
-        all_festivals = []
-        seen_urls = set()
+        festivals = {}
 
-        # Load first page to detect total number of pages
+        # The first page gives both the page count and its own festival links
         print(f"\n🌐 Loading main page: {base_url}")
-        self.driver.get(base_url)
-        time.sleep(5)
-        soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-        total_pages = self.get_total_pages(soup)
+        try:
+            html = await self.fetch(base_url)
+        except FETCH_ERRORS as e:
+            print(f"  ⚠ Fetch failed ({e}), loading it in the browser instead")
+            html = await self.fetch_in_browser(base_url, FESTIVAL_LINK_SELECTOR)
+        tree = LexborHTMLParser(html)
+        total_pages = self.get_total_pages(tree)
 
         if max_pages is None or max_pages > total_pages:
             max_pages = total_pages
@@ -85,62 +249,53 @@ class FestivalScraper:
         print(f"📑 Total pages detected: {total_pages}")
         print(f"➡️  Scraping up to page {max_pages}\n")
 
-        for page in range(1, max_pages + 1):
-            if page == 1:
-                url = base_url
-            else:
-                url = f"https://www.musicfestivalwizard.com/all-festivals/page/{page}/?festivalgenre=electronic&ranked=yes"
+        print(f"📄 Fetched page 1/{max_pages}: {base_url}")
+        found = self.add_festival_links(tree, festivals)
+        print(f"  ✓ Found {found} links (total so far: {len(festivals)})")
+
+        urls = [
+            f"{BASE_URL}/all-festivals/page/{page}/?festivalgenre=electronic&ranked=yes"
+            for page in range(2, max_pages + 1)
+        ]
+        pages = await asyncio.gather(*(self.fetch(url) for url in urls), return_exceptions=True)
 
-            print(f"📄 Fetching page {page}/{max_pages}: {url}")
+        for page, (url, html) in enumerate(zip(urls, pages), 2):
+            print(f"📄 Fetched page {page}/{max_pages}: {url}")
             try:
-                self.driver.get(url)
-                time.sleep(4)
-                WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'a[href*="/festivals/"]'))
-                )
-
-                soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-                festival_links = soup.find_all('a', href=lambda x: x and '/festivals/' in x)
-
-                for link in festival_links:
-                    href = link.get('href', '')
-                    if not href or href.endswith('/festivals/'):
-                        continue
-                    if href.startswith('/'):
-                        href = 'https://www.musicfestivalwizard.com' + href
-                    if href in seen_urls:
-                        continue
-                    seen_urls.add(href)
-                    name = link.get_text(strip=True)
-                    if not name or len(name) < 3:
-                        name = href.split('/')[-2].replace('-', ' ').title()
-                    all_festivals.append({'name': name, 'url': href})
-
-                print(f"  ✓ Found {len(festival_links)} links (total so far: {len(all_festivals)})")
+                if isinstance(html, Exception):
+                    print(f"  ⚠ Fetch failed ({html}), loading it in the browser instead")
+                    html = await self.fetch_in_browser(url, FESTIVAL_LINK_SELECTOR)
+                found = self.add_festival_links(LexborHTMLParser(html), festivals)
+                print(f"  ✓ Found {found} links (total so far: {len(festivals)})")
 
             except Exception as e:
                 print(f"  ✗ Error fetching page {page}: {e}")
                 continue
 
-        print(f"\n✅ Total unique festivals collected: {len(all_festivals)}")
-        return all_festivals
+        print(f"\n✅ Total unique festivals collected: {len(festivals)}")
+        return list(festivals.values())
 
-    def scrape_festival_details(self, url: str) -> Dict:
+    async def scrape_festival_details(self, url: str) -> Dict:
         """Scrape individual festival page for details."""
         print(f"\n📍 Scraping: {url}")
 
         festival_data = {'name': '', 'date': '', 'location': '', 'artists': []}
 
         try:
-            self.driver.get(url)
-            time.sleep(3)
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-
-            # Try JSON-LD
-            json_ld_script = soup.find('script', type='application/ld+json')
+            try:
+                blocks = find_detail_blocks(LexborHTMLParser(await self.fetch(url)))
+            except FETCH_ERRORS as e:
+                print(f"  ⚠ Fetch failed for {url} ({e}), loading it in the browser instead")
+                blocks = None
+
+            # Try JSON-LD, rendering the page in the browser if it isn't in the static HTML
+            if not blocks or not blocks['json_ld']:
+                html = await self.fetch_in_browser(url, DETAIL_READY_SELECTOR)
+                blocks = find_detail_blocks(LexborHTMLParser(html))
+            json_ld_script = blocks['json_ld']
             if json_ld_script:
                 try:
-                    json_data = json.loads(json_ld_script.string)
+                    json_data = orjson.loads(json_ld_script.text())
                     festival_data['name'] = json_data.get('name', '')
                     start_date = json_data.get('startDate', '')
                     end_date = json_data.get('endDate', '')
@@ -158,24 +313,23 @@ class FestivalScraper:
 
             # Fallback HTML parsing
             if not festival_data['name'] or not festival_data['date']:
-                header_block = soup.find('div', class_='headerblock')
+                header_block = blocks['headerblock']
                 if header_block:
-                    h1 = header_block.find('h1')
+                    h1 = header_block.css_first('h1')
                     if h1:
-                        festival_data['name'] = h1.get_text(strip=True)
-                    p_tags = header_block.find_all('p')
+                        festival_data['name'] = h1.text(strip=True)
+                    p_tags = header_block.css('p')
                     if len(p_tags) >= 1:
-                        festival_data['date'] = festival_data['date'] or p_tags[0].get_text(strip=True)
+                        festival_data['date'] = festival_data['date'] or p_tags[0].text(strip=True)
                     if len(p_tags) >= 2:
-                        festival_data['location'] = festival_data['location'] or p_tags[1].get_text(strip=True)
+                        festival_data['location'] = festival_data['location'] or p_tags[1].text(strip=True)
 
             # Artist lineup
-            lineup_div = soup.find('div', class_='hublineup')
+            lineup_div = blocks['hublineup']
             if lineup_div:
-                for li in lineup_div.find_all('li'):
-                    artist = li.get_text(strip=True)
-                    if artist:
-                        festival_data['artists'].append(artist)
+                # Acts playing several stages are listed more than once; keep first appearance
+                artists = [artist for li in lineup_div.css('li') if (artist := li.text(strip=True))]
+                festival_data['artists'] = list(dict.fromkeys(artists))
 
             return festival_data
 
@@ -184,83 +338,103 @@ class FestivalScraper:
             return festival_data
 
     def close(self):
-        """Close the browser"""
+        """Close the browser, if one was started"""
+        if self._driver is None:
+            return
         print("\n🔒 Closing browser...")
-        self.driver.quit()
+        self._driver.quit()
+        self._driver = None
         print("✓ Browser closed")
 
 
 def get_unique_filename(base_name: str = "Festival Output") -> str:
-    """Generate a unique CSV filename with today's date."""
+    """Generate a unique gzipped CSV filename with today's date."""
     date_str = datetime.now().strftime("%m-%d-%Y")
-    filename = f"{base_name} {date_str}.csv"
+    filename = f"{base_name} {date_str}.csv.gz"
     counter = 1
     while os.path.exists(filename):
         counter += 1
-        filename = f"{base_name} {date_str} ({counter}).csv"
+        filename = f"{base_name} {date_str} ({counter}).csv.gz"
     return filename
 
 
-def save_to_csv(festivals_data: List[Dict], filename: str):
-    """Save festival data to CSV file."""
-    print(f"\n💾 Saving data to {filename}...")
+def festival_row(fest: Dict) -> Tuple[str, str, str, str]:
+    """Flatten scraped festival data into a CSV row, in CSV_HEADER order."""
+    return (
+        fest.get('name', ''),
+        fest.get('date', ''),
+        fest.get('location', ''),
+        ', '.join(fest.get('artists', ())),
+    )
 
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['Festival', 'Date', 'Location', 'Artists']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
 
-        for fest in festivals_data:
-            artists_str = ', '.join(fest.get('artists', []))
-            writer.writerow({
-                'Festival': fest.get('name', ''),
-                'Date': fest.get('date', ''),
-                'Location': fest.get('location', ''),
-                'Artists': artists_str
-            })
+async def main_async():
+    print("=" * 70)
+    print("🎵 FESTIVAL WEB SCRAPER — Multipage + Smart CSV Export")
+    print("=" * 70)
 
-    print(f"✓ Saved {len(festivals_data)} festivals to {filename}")
+    os.makedirs(STATE_DIR, exist_ok=True)
+    async with CachedSession(
+        cache=SQLiteBackend(HTTP_CACHE_PATH, expire_after=CACHE_EXPIRE_AFTER),
+        headers={'User-Agent': USER_AGENT},
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+    ) as session:
+        scraper = FestivalScraper(session)
+        try:
+            await scrape_all(scraper)
+        finally:
+            scraper.close()
+
+
+async def scrape_all(scraper: FestivalScraper):
+    """Collect festival links, then scrape every festival page straight to CSV."""
+    main_url = "https://www.musicfestivalwizard.com/all-festivals/?festivalgenre=electronic&ranked=yes"
+    max_pages = None  # Set None for all pages, or an integer for limit (e.g., 4)
+
+    print("\n[STEP 1] Collecting festival links...")
+    festival_links = await scraper.get_festival_links(main_url, max_pages=max_pages)
+    if not festival_links:
+        print("⚠ No festivals found.")
+        return
+
+    filename = get_unique_filename()
+    print(f"\n[STEP 2] Scraping {len(festival_links)} individual festival pages into {filename}...")
+    scraped = with_lineup = total_artists = 0
+
+    # Rows are compressed as they are written rather than held in memory; level 3
+    # costs little next to the per-row Python overhead. Each flush emits a gzip sync
+    # block, so everything up to the last flush can be decompressed after a crash;
+    # flushing every few dozen rows keeps that without inflating the file
+    with gzip.open(filename, 'wt', newline='', encoding='utf-8', compresslevel=3) as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_HEADER)
+
+        # Pages are scraped concurrently but written in link order, so re-runs diff cleanly
+        tasks = [asyncio.create_task(scraper.scrape_festival_details(fest['url'])) for fest in festival_links]
+        for task in tasks:
+            data = await task
+            if not data['name']:
+                continue
+            writer.writerow(festival_row(data))
+            scraped += 1
+            if scraped % CSV_FLUSH_EVERY == 0:
+                csvfile.flush()
+            with_lineup += bool(data['artists'])
+            total_artists += len(data['artists'])
 
+    print(f"✓ Saved {scraped} festivals to {filename}")
 
-def main():
+    print("\n📊 SUMMARY")
     print("=" * 70)
-    print("🎵 FESTIVAL WEB SCRAPER — Multipage + Smart CSV Export")
+    print(f"Total festivals scraped: {scraped}")
+    print(f"Festivals with lineups: {with_lineup}")
+    print(f"Total artists collected: {total_artists}")
+    print(f"File saved as: {filename}")
     print("=" * 70)
 
-    scraper = FestivalScraper()
-    try:
-        main_url = "https://www.musicfestivalwizard.com/all-festivals/?festivalgenre=electronic&ranked=yes"
-        max_pages = None  # Set None for all pages, or an integer for limit (e.g., 4)
 
-        print("\n[STEP 1] Collecting festival links...")
-        festival_links = scraper.get_festival_links(main_url, max_pages=max_pages)
-        if not festival_links:
-            print("⚠ No festivals found.")
-            return
-
-        print(f"\n[STEP 2] Scraping {len(festival_links)} individual festival pages...")
-        all_data = []
-        for i, fest in enumerate(festival_links, 1):
-            print(f"[{i}/{len(festival_links)}] {fest['name']}")
-            data = scraper.scrape_festival_details(fest['url'])
-            if data and data['name']:
-                all_data.append(data)
-            time.sleep(2)
-
-        print("\n[STEP 3] Saving results...")
-        filename = get_unique_filename()
-        save_to_csv(all_data, filename)
-
-        print("\n📊 SUMMARY")
-        print("=" * 70)
-        print(f"Total festivals scraped: {len(all_data)}")
-        print(f"Festivals with lineups: {sum(1 for f in all_data if f['artists'])}")
-        print(f"Total artists collected: {sum(len(f['artists']) for f in all_data)}")
-        print(f"File saved as: {filename}")
-        print("=" * 70)
-
-    finally:
-        scraper.close()
+def main():
+    asyncio.run(main_async())
 
 
 if __name__ == "__main__":